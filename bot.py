@@ -1,5 +1,5 @@
-import os, time, base64, logging, requests
-from datetime import datetime, timezone
+import os, time, base64, random, logging, requests
+import orjson
 from dotenv import load_dotenv
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
@@ -8,6 +8,7 @@ from solders.message import to_bytes_versioned
 from solders.presigner import Presigner
 from solana.rpc.api import Client
 from base58 import b58decode
+from requests.adapters import HTTPAdapter
 
 # === Load ENV ===
 load_dotenv()
@@ -22,10 +23,11 @@ MICRO_BUY_USD = float(os.getenv("MICRO_BUY_USD", "0.01"))
 FALLBACK_BUY_USD = float(os.getenv("FALLBACK_BUY_USD", "0.10"))
 SLIPPAGE_BPS = int(os.getenv("SLIPPAGE_BPS", "500"))
 SCHEDULE_HOURS = 6
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
 
-# === Jupiter Lite APIs ===
-QUOTE_API = "https://lite-api.jup.ag/swap/v1/quote"
-SWAP_API  = "https://lite-api.jup.ag/swap/v1/swap"
+# === Jupiter APIs (Lite by default; override for v6 or self-hosted) ===
+QUOTE_API = os.getenv("JUP_QUOTE_URL", "https://lite-api.jup.ag/swap/v1/quote")
+SWAP_API  = os.getenv("JUP_SWAP_URL", "https://lite-api.jup.ag/swap/v1/swap")
 
 headers = {"Content-Type": "application/json"}
 
@@ -33,7 +35,45 @@ headers = {"Content-Type": "application/json"}
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("charcoin-bot")
 
+# === HTTP Session (keep-alive pool shared by quote + swap) ===
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(max_retries=0, pool_connections=4, pool_maxsize=16))
+SESSION.headers.update(headers)
+SESSION.headers["Connection"] = "keep-alive"
+
 # === Helpers ===
+def _retry_delay(attempt: int, r=None) -> float:
+    """Exponential backoff with full jitter, honoring Retry-After on 429/503."""
+    delay = random.uniform(0, min(8.0, 0.25 * (2 ** attempt)))
+    if r is not None and r.status_code in (429, 503):
+        try:
+            delay = max(delay, float(r.headers.get("Retry-After", 0)))
+        except ValueError:
+            pass
+    return delay
+
+def _request(method: str, url: str, **kwargs):
+    """Send via SESSION, retrying connection errors, 429 and 5xx responses."""
+    r = None
+    for attempt in range(HTTP_RETRIES):
+        try:
+            r = SESSION.request(method, url, timeout=20, **kwargs)
+            if r.status_code != 429 and r.status_code < 500:
+                return r
+        except requests.RequestException:
+            if attempt == HTTP_RETRIES - 1:
+                raise
+            r = None
+        if attempt < HTTP_RETRIES - 1:
+            time.sleep(_retry_delay(attempt, r))
+    return r
+
+def http_get(url: str, **kwargs):
+    return _request("GET", url, **kwargs)
+
+def http_post(url: str, **kwargs):
+    return _request("POST", url, **kwargs)
+
 def get_usdt_amount(usd: float) -> int:
     """Convert 1 USDT ≈ 1 USD → smallest unit (6 decimals)."""
     return int(usd * 1_000_000)
@@ -47,38 +87,38 @@ def get_quote(amount_usdt: int):
         "onlyDirectRoutes": "true",            # 🚀 Force single pool
         "restrictIntermediateTokens": "true",  # 🚫 Prevent USDT→SOL→CHAR
     }
-    r = requests.get(QUOTE_API, params=params, headers=headers)
+    r = http_get(QUOTE_API, params=params)
     if r.status_code != 200:
         raise RuntimeError(f"Quote failed: {r.status_code} {r.text}")
-    return r.json()
+    return orjson.loads(r.content)
 
 
+# Static part of the /swap body, serialized once; only quoteResponse varies.
+_SWAP_PREFIX = orjson.dumps({
+    "userPublicKey": PUBLIC_KEY,
+    "dynamicComputeUnitLimit": True,
+    "dynamicSlippage": True,
+    "wrapAndUnwrapSol": True
+})[:-1]
+
 def execute_swap(quote):
-    swap_req = {
-        "quoteResponse": quote,
-        "userPublicKey": PUBLIC_KEY,
-        "dynamicComputeUnitLimit": True,
-        "dynamicSlippage": True,
-        "wrapAndUnwrapSol": True
-    }
+    body = _SWAP_PREFIX + b',"quoteResponse":' + orjson.dumps(quote) + b"}"
 
-    r = requests.post(SWAP_API, json=swap_req, headers=headers)
+    r = http_post(SWAP_API, data=body)
     if r.status_code != 200:
         raise RuntimeError(f"Swap API failed: {r.status_code} {r.text}")
 
-    tx_b64 = r.json().get("swapTransaction")
+    tx_b64 = orjson.loads(r.content).get("swapTransaction")
     if not tx_b64:
         raise RuntimeError("No transaction in swap response")
 
-    client = Client(RPC_URL)
-    kp = Keypair.from_bytes(b58decode(WALLET_SECRET_B58))
     raw_tx = base64.b64decode(tx_b64)
     tx = VersionedTransaction.from_bytes(raw_tx)
     msg_bytes = to_bytes_versioned(tx.message)
 
-    sig = kp.sign_message(msg_bytes)
-    signed_tx = VersionedTransaction(tx.message, [Presigner(kp.pubkey(), sig)])
-    resp = client.send_raw_transaction(bytes(signed_tx))
+    sig = _KP.sign_message(msg_bytes)
+    signed_tx = VersionedTransaction(tx.message, [Presigner(_PK, sig)])
+    resp = _RPC.send_raw_transaction(bytes(signed_tx))
     sig_str = getattr(resp, "value", None) or resp.get("result")
 
     if not sig_str:
@@ -88,13 +128,22 @@ def execute_swap(quote):
     return sig_str
 
 # === Wallet Check ===
+# Decoded once in ensure_wallet() and reused by every swap.
+_KP = None
+_PK = None
+_RPC = None
+
 def ensure_wallet():
+    global _KP, _PK, _RPC
     if not PUBLIC_KEY or not WALLET_SECRET_B58:
         raise SystemExit("PUBLIC_KEY and WALLET_SECRET_B58 required")
-    client = Client(RPC_URL)
-    pk = Pubkey.from_string(PUBLIC_KEY)
-    bal = client.get_balance(pk).value / 1_000_000_000
-    logger.info(f"Wallet {pk} balance: {bal:.6f} SOL")
+    _RPC = Client(RPC_URL)
+    _KP = Keypair.from_bytes(b58decode(WALLET_SECRET_B58))
+    _PK = _KP.pubkey()
+    if _PK != Pubkey.from_string(PUBLIC_KEY):
+        raise SystemExit("WALLET_SECRET_B58 does not match PUBLIC_KEY")
+    bal = _RPC.get_balance(_PK).value / 1_000_000_000
+    logger.info(f"Wallet {_PK} balance: {bal:.6f} SOL")
 
 # === Main Bot ===
 def run_bot():